@@ -1,12 +1,18 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 import plotly.graph_objects as go
-import plotly.express as px
 import requests
-import time
-import json
-from datetime import datetime, timedelta
-from typing import Dict, List
+import aiohttp
+import asyncio
+import threading
+import orjson
+from streamlit_autorefresh import st_autorefresh
+from dataclasses import dataclass, field
+from datetime import datetime
+from functools import lru_cache
+from urllib.parse import urlencode
+from typing import Dict, List, Tuple
 
 # Configuração da página
 st.set_page_config(
@@ -16,66 +22,259 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+# Mapeamento símbolo -> ID do CoinGecko (construído uma única vez)
+SYMBOL_TO_ID = {
+    'BTC': 'bitcoin',
+    'ETH': 'ethereum',
+    'ADA': 'cardano',
+    'DOT': 'polkadot',
+    'SOL': 'solana'
+}
+
+@lru_cache(maxsize=64)
+def _ids_str(symbols: Tuple[str, ...]) -> Tuple[str, Tuple[str, ...]]:
+    """IDs do CoinGecko e string já juntada para uma seleção de símbolos"""
+    ids = tuple(SYMBOL_TO_ID.get(symbol, symbol.lower()) for symbol in symbols)
+    return ','.join(ids), ids
+
+# Cotação de uma moeda - campos tipados e __slots__ em vez de dicts soltos
+@dataclass(slots=True)
+class Coin:
+    price: float = 0.0
+    change_24h: float = 0.0
+    market_cap: float = 0.0
+    volume_24h: float = 0.0
+    sparkline_7d: List[float] = field(default_factory=list)
+
 # Cache para dados
 @st.cache_data(ttl=60)  # Cache por 60 segundos
-def fetch_crypto_data(symbols: List[str]) -> Dict:
+def fetch_crypto_data(symbols: List[str]) -> Dict[str, Coin]:
     """Fetch cryptocurrency data from CoinGecko API"""
     try:
         # Converter símbolos para IDs do CoinGecko
-        symbol_to_id = {
-            'BTC': 'bitcoin',
-            'ETH': 'ethereum', 
-            'ADA': 'cardano',
-            'DOT': 'polkadot',
-            'SOL': 'solana'
-        }
-
-        ids = [symbol_to_id.get(symbol, symbol.lower()) for symbol in symbols]
-        ids_str = ','.join(ids)
+        ids_str, ids = _ids_str(tuple(symbols))
 
-        url = f"https://api.coingecko.com/api/v3/simple/price"
+        url = f"https://api.coingecko.com/api/v3/coins/markets"
         params = {
+            'vs_currency': 'usd',
             'ids': ids_str,
-            'vs_currencies': 'usd',
-            'include_24hr_change': 'true',
-            'include_market_cap': 'true',
-            'include_24hr_vol': 'true'
+            'sparkline': 'true',
+            'price_change_percentage': '24h'
         }
 
-        response = requests.get(url, params=params, timeout=10)
-        response.raise_for_status()
-
-        data = response.json()
+        data = _get_json(url, params)
 
         # Converter para formato esperado
+        by_id = {coin['id']: coin for coin in data}
         result = {}
         for symbol, coin_id in zip(symbols, ids):
-            if coin_id in data:
-                coin_data = data[coin_id]
-                result[symbol] = {
-                    'price': coin_data.get('usd', 0),
-                    'change_24h': coin_data.get('usd_24h_change', 0),
-                    'market_cap': coin_data.get('usd_market_cap', 0),
-                    'volume_24h': coin_data.get('usd_24h_vol', 0)
-                }
+            if coin_id in by_id:
+                coin_data = by_id[coin_id]
+                result[symbol] = Coin(
+                    price=coin_data.get('current_price') or 0,
+                    change_24h=coin_data.get('price_change_percentage_24h') or 0,
+                    market_cap=coin_data.get('market_cap') or 0,
+                    volume_24h=coin_data.get('total_volume') or 0,
+                    sparkline_7d=(coin_data.get('sparkline_in_7d') or {}).get('price', [])
+                )
 
         return result
 
     except Exception as e:
         st.error(f"Erro ao buscar dados: {str(e)}")
         # Retornar dados mock em caso de erro
-        return {symbol: {
-            'price': 50000 + hash(symbol) % 10000,
-            'change_24h': (hash(symbol) % 20) - 10,
-            'market_cap': 1000000000,
-            'volume_24h': 50000000
-        } for symbol in symbols}
-
-def create_price_chart(data: Dict) -> go.Figure:
+        return {symbol: Coin(
+            price=50000 + hash(symbol) % 10000,
+            change_24h=(hash(symbol) % 20) - 10,
+            market_cap=1000000000,
+            volume_24h=50000000
+        ) for symbol in symbols}
+
+# Event loop persistente numa thread de fundo - as threads das sessões
+# Streamlit submetem corrotinas via run_coroutine_threadsafe
+@st.cache_resource
+def get_event_loop() -> asyncio.AbstractEventLoop:
+    """Criar event loop partilhado, a correr numa thread dedicada"""
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+    return loop
+
+# Cache de ETags - permite revalidar respostas sem voltar a transferir o corpo
+@st.cache_resource
+def _etag_cache() -> Dict[str, tuple]:
+    """Mapa url+params -> (etag, payload) partilhado pelo processo"""
+    return {}
+
+def _get_json(url: str, params: Dict):
+    """GET condicional com If-None-Match - devolve o payload descodificado"""
+    cache = _etag_cache()
+    key = f"{url}?{urlencode(sorted(params.items()))}"
+    etag, payload = cache.get(key, (None, None))
+
+    headers = {'If-None-Match': etag} if etag else {}
+    response = requests.get(url, params=params, headers=headers, timeout=10)
+
+    if response.status_code == 304 and payload is not None:
+        return payload
+
+    response.raise_for_status()
+
+    payload = orjson.loads(response.content)
+    cache[key] = (response.headers.get('ETag'), payload)
+    return payload
+
+async def _get_json_async(session: aiohttp.ClientSession, url: str, params: Dict):
+    """Versão assíncrona de _get_json sobre a sessão partilhada"""
+    cache = _etag_cache()
+    key = f"{url}?{urlencode(sorted(params.items()))}"
+    etag, payload = cache.get(key, (None, None))
+
+    headers = {'If-None-Match': etag} if etag else {}
+    async with session.get(
+        url, params=params, headers=headers, timeout=aiohttp.ClientTimeout(total=10)
+    ) as response:
+        if response.status == 304 and payload is not None:
+            return payload
+
+        response.raise_for_status()
+
+        payload = orjson.loads(await response.read())
+        cache[key] = (response.headers.get('ETag'), payload)
+        return payload
+
+# Sessão HTTP persistente - reutiliza ligações TCP/TLS entre reruns
+@st.cache_resource
+def get_http_session() -> aiohttp.ClientSession:
+    """Criar sessão aiohttp partilhada para todo o processo"""
+    return aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(limit=20, ttl_dns_cache=300)
+    )
+
+class CryptoAPI:
+    """Cliente para a API do CoinGecko"""
+
+    BASE_URL = "https://api.coingecko.com/api/v3"
+
+    async def get_crypto_data(self, coins: List[str]) -> Dict:
+        """Buscar preços atuais das criptomoedas numa única chamada"""
+        try:
+            session = get_http_session()
+            params = {
+                'vs_currency': 'usd',
+                'ids': ','.join(coins),
+                'sparkline': 'true',
+                'price_change_percentage': '24h'
+            }
+            data = await _get_json_async(session, f"{self.BASE_URL}/coins/markets", params)
+
+            return {coin['id']: {
+                'usd': coin.get('current_price', 0),
+                'usd_24h_change': coin.get('price_change_percentage_24h', 0),
+                'usd_market_cap': coin.get('market_cap', 0),
+                'usd_24h_vol': coin.get('total_volume', 0),
+                'sparkline_in_7d': (coin.get('sparkline_in_7d') or {}).get('price', [])
+            } for coin in data}
+        except Exception:
+            return {}
+
+    def get_historical_data(self, coin_id: str, days: int = 7) -> pd.DataFrame:
+        """Buscar dados históricos de preço e volume (com cache)"""
+        return _fetch_history(coin_id, days)
+
+    async def get_historical_data_async(self, session: aiohttp.ClientSession,
+                                        coin_id: str, days: int = 7) -> pd.DataFrame:
+        """Buscar dados históricos de forma assíncrona"""
+        try:
+            url = f"{self.BASE_URL}/coins/{coin_id}/market_chart"
+            params = {'vs_currency': 'usd', 'days': days}
+
+            data = await _get_json_async(session, url, params)
+
+            prices = np.asarray(data['prices'])
+            volumes = np.asarray(data['total_volumes'])
+
+            return pd.DataFrame({
+                # cast direto ms -> datetime64, sem o dispatch de pd.to_datetime
+                'timestamp': prices[:, 0].astype('int64').astype('datetime64[ms]'),
+                'price': prices[:, 1].astype(np.float32),
+                'volume': volumes[:, 1].astype(np.float32)
+            })
+
+        except Exception:
+            return pd.DataFrame()
+
+    async def get_all_historical_data(self, coin_ids: List[str],
+                                      days: int = 7) -> Dict[str, pd.DataFrame]:
+        """Buscar históricos de várias moedas em paralelo"""
+        session = get_http_session()
+        semaphore = asyncio.Semaphore(5)  # respeitar o rate limit do CoinGecko
+
+        async def fetch(coin_id: str) -> pd.DataFrame:
+            async with semaphore:
+                return await self.get_historical_data_async(session, coin_id, days)
+
+        results = await asyncio.gather(*(fetch(coin_id) for coin_id in coin_ids))
+        return dict(zip(coin_ids, results))
+
+# Cache de históricos - os gráficos de 7/30/90/365 dias mudam pouco entre reruns
+@st.cache_data(ttl=300)
+def _fetch_history(coin_id: str, days: int) -> pd.DataFrame:
+    """Buscar o histórico de uma moeda (cache de 5 minutos)"""
+    try:
+        url = f"{CryptoAPI.BASE_URL}/coins/{coin_id}/market_chart"
+        params = {'vs_currency': 'usd', 'days': days}
+
+        data = _get_json(url, params)
+
+        prices = np.asarray(data['prices'])
+        volumes = np.asarray(data['total_volumes'])
+
+        return pd.DataFrame({
+            # cast direto ms -> datetime64, sem o dispatch de pd.to_datetime
+            'timestamp': prices[:, 0].astype('int64').astype('datetime64[ms]'),
+            'price': prices[:, 1].astype(np.float32),
+            'volume': volumes[:, 1].astype(np.float32)
+        })
+
+    except Exception:
+        return pd.DataFrame()
+
+@st.cache_data(ttl=300)
+def _fetch_histories(coin_ids: tuple, days: int) -> Dict[str, pd.DataFrame]:
+    """Buscar os históricos de várias moedas (cache de 5 minutos)"""
+    api = CryptoAPI()
+    future = asyncio.run_coroutine_threadsafe(
+        api.get_all_historical_data(list(coin_ids), days=days),
+        get_event_loop()
+    )
+    return future.result()
+
+def format_currency(values) -> np.ndarray:
+    """Formatar valores em USD com sufixos K/M/B/T (vetorizado)"""
+    vals = np.asarray(values, dtype=np.float64)
+    bins = np.digitize(vals, [1e3, 1e6, 1e9, 1e12])
+    scales = np.array([1.0, 1e3, 1e6, 1e9, 1e12])[bins]
+    suffixes = np.array(['', 'K', 'M', 'B', 'T'])[bins]
+    scaled = np.char.mod('%.2f', vals / scales)
+    return np.char.add(np.char.add('$', scaled), suffixes)
+
+def top_movers(changes: np.ndarray, k: int = 3):
+    """Índices das maiores subidas e descidas num único passo O(N)"""
+    k = min(k, len(changes))
+    if k == 0:
+        return np.array([], dtype=int), np.array([], dtype=int)
+
+    top = np.argpartition(-changes, k - 1)[:k]
+    bottom = np.argpartition(changes, k - 1)[:k]
+
+    return top[np.argsort(-changes[top])], bottom[np.argsort(changes[bottom])]
+
+@st.cache_data(ttl=60)
+def create_price_chart(data: Dict[str, Coin]) -> go.Figure:
     """Criar gráfico de preços"""
     symbols = list(data.keys())
-    prices = [data[symbol]['price'] for symbol in symbols]
-    changes = [data[symbol]['change_24h'] for symbol in symbols]
+    prices = [data[symbol].price for symbol in symbols]
+    changes = [data[symbol].change_24h for symbol in symbols]
 
     colors = ['green' if change >= 0 else 'red' for change in changes]
 
@@ -99,10 +298,11 @@ def create_price_chart(data: Dict) -> go.Figure:
 
     return fig
 
-def create_change_chart(data: Dict) -> go.Figure:
+@st.cache_data(ttl=60)
+def create_change_chart(data: Dict[str, Coin]) -> go.Figure:
     """Criar gráfico de mudanças 24h"""
     symbols = list(data.keys())
-    changes = [data[symbol]['change_24h'] for symbol in symbols]
+    changes = [data[symbol].change_24h for symbol in symbols]
 
     colors = ['green' if change >= 0 else 'red' for change in changes]
 
@@ -126,7 +326,31 @@ def create_change_chart(data: Dict) -> go.Figure:
 
     return fig
 
-def display_dashboard(selected_cryptos: List[str]):
+@st.cache_data(ttl=60)
+def create_history_chart(histories: Dict[str, pd.DataFrame], days: int) -> go.Figure:
+    """Criar gráfico de evolução dos preços"""
+    fig = go.Figure()
+
+    for symbol, df in histories.items():
+        if not df.empty:
+            fig.add_trace(go.Scatter(
+                x=df['timestamp'].to_numpy(),
+                y=df['price'].to_numpy(),
+                mode='lines',
+                name=symbol
+            ))
+
+    fig.update_layout(
+        title=f"Evolução de Preços ({days} dias)",
+        xaxis_title="Data",
+        yaxis_title="Preço (USD)",
+        template="plotly_dark",
+        height=400
+    )
+
+    return fig
+
+def display_dashboard(selected_cryptos: List[str], period: int = 7):
     """Exibir dashboard principal"""
 
     # Buscar dados
@@ -139,12 +363,12 @@ def display_dashboard(selected_cryptos: List[str]):
     cols = st.columns(len(selected_cryptos))
     for i, symbol in enumerate(selected_cryptos):
         if symbol in crypto_data:
-            data = crypto_data[symbol]
+            coin = crypto_data[symbol]
             with cols[i]:
                 st.metric(
                     label=f"{symbol}",
-                    value=f"${data['price']:,.2f}",
-                    delta=f"{data['change_24h']:+.2f}%"
+                    value=f"${coin.price:,.2f}",
+                    delta=f"{coin.change_24h:+.2f}%"
                 )
 
     # Gráficos
@@ -158,34 +382,71 @@ def display_dashboard(selected_cryptos: List[str]):
         change_chart = create_change_chart(crypto_data)
         st.plotly_chart(change_chart, use_container_width=True, key="change_chart")
 
+    # Histórico de preços - buscar todas as moedas em paralelo
+    st.subheader("📈 Histórico de Preços")
+
+    _, coin_ids = _ids_str(tuple(selected_cryptos))
+
+    if period == 7:
+        # O sparkline de 7 dias já veio em /coins/markets - evita N chamadas extra
+        histories = {}
+        for symbol in selected_cryptos:
+            coin = crypto_data.get(symbol)
+            spark = coin.sparkline_7d if coin else []
+            if spark:
+                prices = np.asarray(spark, dtype=np.float32)
+                end = pd.Timestamp.now('UTC').floor('h')
+                timestamps = pd.date_range(end=end, periods=len(prices), freq='h')
+                histories[symbol] = pd.DataFrame({'timestamp': timestamps, 'price': prices})
+            else:
+                histories[symbol] = pd.DataFrame()
+    else:
+        results = _fetch_histories(tuple(coin_ids), period)
+        histories = {symbol: results[coin_id]
+                     for symbol, coin_id in zip(selected_cryptos, coin_ids)}
+
+    history_chart = create_history_chart(histories, period)
+    st.plotly_chart(history_chart, use_container_width=True, key="history_chart")
+
     # Tabela detalhada
     st.subheader("📋 Dados Detalhados")
 
-    table_data = []
-    for symbol in selected_cryptos:
-        if symbol in crypto_data:
-            data = crypto_data[symbol]
-            table_data.append({
-                'Símbolo': symbol,
-                'Preço (USD)': f"${data['price']:,.2f}",
-                'Mudança 24h (%)': f"{data['change_24h']:+.2f}%",
-                'Market Cap': f"${data['market_cap']:,.0f}",
-                'Volume 24h': f"${data['volume_24h']:,.0f}"
-            })
-
-    df = pd.DataFrame(table_data)
+    symbols = [symbol for symbol in selected_cryptos if symbol in crypto_data]
+    count = len(symbols)
+    prices = np.fromiter((crypto_data[s].price for s in symbols), dtype=np.float64, count=count)
+    changes = np.fromiter((crypto_data[s].change_24h for s in symbols), dtype=np.float64, count=count)
+    market_caps = np.fromiter((crypto_data[s].market_cap for s in symbols), dtype=np.float64, count=count)
+    volumes = np.fromiter((crypto_data[s].volume_24h for s in symbols), dtype=np.float64, count=count)
+
+    df = pd.DataFrame({
+        'Símbolo': symbols,
+        'Preço (USD)': [f"${price:,.2f}" for price in prices],
+        'Mudança 24h (%)': [f"{change:+.2f}%" for change in changes],
+        'Market Cap': format_currency(market_caps),
+        'Volume 24h': format_currency(volumes)
+    })
     st.dataframe(df, use_container_width=True)
 
+    # Maiores altas e baixas (24h)
+    st.subheader("🏆 Maiores Altas e Baixas (24h)")
+    top_idx, bottom_idx = top_movers(changes)
+
+    col_up, col_down = st.columns(2)
+    with col_up:
+        for i in top_idx:
+            st.success(f"📈 {symbols[i]}: {changes[i]:+.2f}%")
+    with col_down:
+        for i in bottom_idx:
+            st.error(f"📉 {symbols[i]}: {changes[i]:+.2f}%")
+
     # Alertas
     st.subheader("🚨 Alertas")
     alert_container = st.container()
     with alert_container:
-        for symbol in selected_cryptos:
-            if symbol in crypto_data:
-                change = crypto_data[symbol]['change_24h']
-                if abs(change) > 5:
-                    alert_type = "🔥" if change > 0 else "❄️"
-                    st.info(f"{alert_type} {symbol}: {change:+.2f}% nas últimas 24h")
+        for i in np.flatnonzero(np.abs(changes) > 5):
+            change = changes[i]
+            alert_type = "🔥" if change > 0 else "❄️"
+            st.info(f"{alert_type} {symbols[i]}: {change:+.2f}% nas últimas 24h")
 
     # Footer
     st.markdown("---")
@@ -213,13 +474,31 @@ def main():
         st.warning("Por favor, selecione pelo menos uma criptomoeda.")
         return
 
+    # Período do histórico de preços
+    period = st.sidebar.selectbox(
+        "Período do histórico (dias):",
+        [7, 30, 90, 365],
+        key="history_period"
+    )
+
     # Botão de refresh manual
     if st.sidebar.button("🔄 Atualizar Dados", key="refresh_button"):
         st.cache_data.clear()
         st.rerun()
 
+    # Botão para limpar apenas o cache do histórico
+    if st.sidebar.button("🧹 Limpar cache do histórico", key="clear_history_cache"):
+        _fetch_history.clear()
+        _fetch_histories.clear()
+        st.rerun()
+
+    # Auto-refresh agendado no cliente - não bloqueia o worker do servidor
+    auto_refresh = st.sidebar.checkbox("🔄 Auto-refresh (30s)", value=False, key="auto_refresh")
+    if auto_refresh:
+        st_autorefresh(interval=30_000, key="refresh")
+
     # Exibir dashboard
-    display_dashboard(selected_cryptos)
+    display_dashboard(selected_cryptos, period)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,38 @@
+import asyncio
+import os
+from pathlib import Path
+
+import orjson
+import pytest
+from app.main import CryptoAPI, get_event_loop
+
+FIXTURE_COINS = ['bitcoin', 'ethereum']
+
+# Cache persistente entre execuções - apagar o ficheiro (ou definir
+# REFRESH_FIXTURES=1) para voltar a buscar dados reais
+FIXTURE_PATH = Path(__file__).parent / '.coingecko_fixture.json'
+
+@pytest.fixture(scope='session')
+def coingecko_fixture():
+    """Uma única chamada real à API, guardada em disco e reutilizada"""
+    if not FIXTURE_PATH.exists() or os.environ.get('REFRESH_FIXTURES'):
+        future = asyncio.run_coroutine_threadsafe(
+            CryptoAPI().get_crypto_data(FIXTURE_COINS), get_event_loop())
+        data = future.result()
+
+        if not data:
+            pytest.skip("CoinGecko indisponível - testes de rede ignorados")
+
+        FIXTURE_PATH.write_bytes(orjson.dumps(data))
+
+    return orjson.loads(FIXTURE_PATH.read_bytes())
+
+@pytest.fixture(scope='session')
+def history_fixture():
+    """Histórico de 1 dia do bitcoin, buscado uma única vez por sessão"""
+    df = CryptoAPI().get_historical_data('bitcoin', days=1)
+
+    if df.empty:
+        pytest.skip("CoinGecko indisponível - testes de rede ignorados")
+
+    return df